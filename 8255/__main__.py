@@ -1,18 +1,140 @@
 # Copyright (c) 2024-2025 iiPython
 
 # Modules
-import re
-import operator
 from pathlib import Path
+from dataclasses import dataclass
 from argparse import ArgumentParser
-
-from .stack import NullDataInOperation, Stack, StackError
-from .construct import construct_program
-
-# Regex assignments
-variable_regex = re.compile(r"\&(\w+)")
-allocation_regex = re.compile(r":\[(\d+)\]")
-string_sub_regex = re.compile(r"(\$\w+)")
+from typing import Callable
+
+from .stack import RESERVED_REGISTERS, NullDataInOperation, Stack, StackError
+from .construct import OPCODES, construct_program
+
+# Runtime state shared between op handlers
+@dataclass
+class State:
+    stack:      Stack
+    """The stack backing this program."""
+    comparison: str | None = None
+    """The jump type matching the last cmp instruction."""
+
+# Handle values
+def resolve_operand(stack: Stack, operand: tuple[str, object]) -> str | int:
+    """Resolve a preparsed (type, payload) operand against the stack."""
+    tag, payload = operand
+    if tag == "var":
+        return stack.get_register(payload)  # pyright: ignore
+
+    if tag in ("int", "str"):
+        return payload  # pyright: ignore
+
+    return "".join(
+        str(stack.get_register(part)) if part_tag == "var" else part
+        for part_tag, part in payload  # pyright: ignore
+    )
+
+# Op handlers, resolved once per program line by resolve_ops(); each takes the
+# runtime state and the line's operands, returning the next line index when jumping
+def op_out(state: State, args: tuple) -> None:
+    print(resolve_operand(state.stack, args[0]))
+
+def op_lbl(state: State, args: tuple) -> None:
+    pass
+
+def op_ext(state: State, args: tuple) -> None:
+    exit(resolve_operand(state.stack, args[0]))
+
+def op_cls(state: State, args: tuple) -> None:
+    print("\033[2J\033[H", end = "", flush = True)
+
+def op_alc(state: State, args: tuple) -> None:
+    state.stack.allocate_register(args[0], args[1])
+
+def op_inp(state: State, args: tuple) -> None:
+    value = resolve_operand(state.stack, args[0])
+    if not isinstance(value, str):
+        raise ValueError("argument to inp must be a STRING")
+
+    state.stack.write_register(args[1], input(value))
+
+def op_arith(state: State, args: tuple) -> None:
+    operation, num1, num2, variable = args
+    state.stack.write_register(
+        variable,
+        operation(resolve_operand(state.stack, num1), resolve_operand(state.stack, num2))
+    )
+
+def op_cst(state: State, args: tuple) -> None:
+    variable, cast = args
+    state.stack.write_register(variable, cast(state.stack.get_register(variable)))
+
+def op_cmp(state: State, args: tuple) -> None:
+    variable1, variable2 = resolve_operand(state.stack, args[0]), resolve_operand(state.stack, args[1])
+    if variable1 == variable2:
+        state.comparison = "jeq"
+
+    elif variable1 != variable2:
+        state.comparison = "jne"
+
+    # Ensure our types are the same
+    elif type(variable1) is not type(variable2):
+            raise ValueError("comparison variable types must be same when using >/</>=/<=")
+
+    elif variable1 > variable2:  # type: ignore | Checked above
+        state.comparison = "jgt"
+
+    elif variable1 < variable2:  # type: ignore | Checked above
+        state.comparison = "jlt"
+
+    elif variable1 >= variable2:  # type: ignore | Checked above
+        state.comparison = "jge"
+
+    elif variable1 <= variable2:  # type: ignore | Checked above
+        state.comparison = "jle"
+
+def op_cmp_jmp(state: State, args: tuple) -> int | None:
+    jump_type, operand1, operand2, target = args
+    variable1, variable2 = resolve_operand(state.stack, operand1), resolve_operand(state.stack, operand2)
+    state.comparison = "jeq" if variable1 == variable2 else "jne"
+    if state.comparison == jump_type:
+        state.stack.slx = 0
+        return target
+
+def op_jmp(state: State, args: tuple) -> int | None:
+    jump_type, target = args
+    if state.comparison == jump_type:
+        return target
+
+def op_drp(state: State, args: tuple) -> None:
+    state.stack.drop_register(args[0])
+
+def op_set(state: State, args: tuple) -> None:
+    state.stack.write_register(args[1], resolve_operand(state.stack, args[0]))
+
+HANDLERS: dict[str, Callable] = {
+    "out":   op_out,
+    "lbl":   op_lbl,
+    "ext":   op_ext,
+    "cls":   op_cls,
+    "alc":   op_alc,
+    "inp":   op_inp,
+    "arith": op_arith,
+    "cst":   op_cst,
+    "cmp":   op_cmp,
+    "cmp_jmp": op_cmp_jmp,
+    "jmp":   op_jmp,
+    "drp":   op_drp,
+    "set":   op_set,
+}
+
+# Ops that can raise a non-StackError at runtime (and must report through slx);
+# everything else only raises StackErrors, which abort the program regardless,
+# so their handlers run without exception machinery on the happy path
+FALLIBLE_OPS = frozenset({"out", "cls", "alc", "inp", "arith", "cst", "set"})
+
+# Dispatch and fallibility tables indexed by the integer opcodes construct emits
+OPCODE_ORDER = sorted(OPCODES, key = OPCODES.get)  # pyright: ignore
+DISPATCH: tuple[Callable, ...] = tuple(HANDLERS[mnemonic] for mnemonic in OPCODE_ORDER)
+FALLIBLE: tuple[bool, ...] = tuple(mnemonic in FALLIBLE_OPS for mnemonic in OPCODE_ORDER)
 
 # Handle loading file
 def process_file(filepath: Path, debug: bool = False) -> None:
@@ -20,50 +142,29 @@ def process_file(filepath: Path, debug: bool = False) -> None:
 
     # Initialize
     program = construct_program(file_lines)
-    stack = Stack(program.byte_size)
-
-    # Handle values
-    def process_value(value: str) -> str | int:
-        if value[0] == "&":
-            if not value[1:]:
-                raise SyntaxError
-
-            return stack.get_variable(value[1:])
-
-        if value.lstrip("-").isnumeric():
-            return int(value)
-
-        if not (value[0] == "\"" and value[-1] == "\"" and len(value) > 1):
-            raise SyntaxError
-
-        value = value.strip("\"")
-        for variable in re.findall(string_sub_regex, value):
-            value = value.replace(variable, str(stack.get_variable(variable[1:])))
-
-        return value.encode("latin-1", "backslashreplace").decode("unicode-escape")
-
-    def handle_variable(variable: str, regex: re.Pattern = variable_regex) -> str:
-        variable_match = re.match(regex, variable)
-        if not variable_match:
-            raise SyntaxError
-
-        return variable_match.group(1)
+    stack = Stack(program.byte_size, program.registers)
+    code = program.code
+    state = State(stack)
 
     # Handle iteration
-    current_line, comparison_result = 0, None
-    while current_line <= len(program.lines) - 1:
+    current_line = 0
+    while current_line <= len(code) - 1:
         if debug:
             print(f"\033[2J\033[H\033[32m[Execute] {' '.join(program.lines[current_line])}\033[0m")
-            for name, register in stack.vars.items():
-                value = getattr(register, "value", None)
-                if value is None:
-                    try:
-                        value = stack.get_variable(name)
+            for name in RESERVED_REGISTERS:
+                print(f"\033[90m\t[{name}] {getattr(stack, name)}\033[0m")
+
+            for index, register in enumerate(stack.regs):
+                if register is None:
+                    continue
+
+                try:
+                    value = stack.get_register(index)
 
-                    except NullDataInOperation:
-                        value = None
+                except NullDataInOperation:
+                    value = None
 
-                print(f"\033[90m\t[{name}] {value}\033[0m")
+                print(f"\033[90m\t[{stack.names[index]}] {value}\033[0m")
 
             print("\n\033[90m[Stepped]")
             for line in program.lines[:current_line]:
@@ -71,94 +172,29 @@ def process_file(filepath: Path, debug: bool = False) -> None:
 
             input("\n\033[33mPress [ENTER] to step.\033[0m")
 
-        try:
-            match program.lines[current_line]:
-                case ["out", message]:
-                    print(process_value(message))
-
-                case ["lbl", _]:
-                    pass
-
-                case ["ext", code]:
-                    exit(process_value(code))
-
-                case ["cls"]:
-                    print("\033[2J\033[H", end = "", flush = True)
-            
-                case ["alc", variable, allocation]:
-                    stack.allocate_variable(
-                        handle_variable(variable),
-                        int(handle_variable(allocation, allocation_regex))
-                    )
+        opcode, args = code[current_line]
+        handler = DISPATCH[opcode]
+        if FALLIBLE[opcode]:
+            try:
+                next_line = handler(state, args)
 
-                case ["inp", prompt, ">", variable]:
-                    value = process_value(prompt)
-                    if not isinstance(value, str):
-                        raise ValueError("argument to inp must be a STRING")
+            except Exception as e:
+                if isinstance(e, (StackError, SyntaxError)):
+                    raise e
 
-                    stack.write_variable(handle_variable(variable), input(value))
+                next_line, slx_code = None, 1
 
-                case ["add" | "sub" | "mul" | "div" | "pow" as operator_type, num1, num2, ">", variable]:
-                    stack.write_variable(
-                        handle_variable(variable),
-                        getattr(operator, operator_type if operator_type != "div" else "truediv")(process_value(num1), process_value(num2))
-                    )
-
-                case ["cst", variable, "STRING" | "INTEGER" as cast_type]:
-                    variable = handle_variable(variable)
-                    stack.write_variable(
-                        variable,
-                        {"INTEGER": int, "STRING": str}[cast_type](stack.get_variable(variable))
-                    )
-
-                case ["cmp", variable1, variable2]:
-                    variable1, variable2 = process_value(variable1), process_value(variable2)
-                    if variable1 == variable2:
-                        comparison_result = "jeq"
-
-                    elif variable1 != variable2:
-                        comparison_result = "jne"
-
-                    # Ensure our types are the same
-                    elif type(variable1) is not type(variable2):
-                            raise ValueError("comparison variable types must be same when using >/</>=/<=")
-
-                    elif variable1 > variable2:  # type: ignore | Checked above
-                        comparison_result = "jgt"
-
-                    elif variable1 < variable2:  # type: ignore | Checked above
-                        comparison_result = "jlt"
-
-                    elif variable1 >= variable2:  # type: ignore | Checked above
-                        comparison_result = "jge"
-
-                    elif variable1 <= variable2:  # type: ignore | Checked above
-                        comparison_result = "jle"
-
-                case ["jeq" | "jne" | "jgt" | "jlt" | "jge" | "jle" as jump_type, label]:
-                    if comparison_result == jump_type:
-                        current_line = program.labels[label]
-                        continue
-
-                case ["drp", variable]:
-                    stack.drop_variable(handle_variable(variable))
-
-                case [value, ">", variable]:
-                    stack.write_variable(handle_variable(variable), process_value(value))
-
-                case _ as default:
-                    raise SyntaxError(default)
-
-        except Exception as e:
-            if isinstance(e, (StackError, SyntaxError)):
-                raise e
-
-            slx_code = 1
+            else:
+                slx_code = 0
 
         else:
-            slx_code = 0
+            next_line, slx_code = handler(state, args), 0
+
+        if next_line is not None:
+            current_line = next_line
+            continue
 
-        stack.write_variable("slx", slx_code, reserved = True)
+        stack.slx = slx_code
         current_line += 1
 
 if __name__ == "__main__":
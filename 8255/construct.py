@@ -1,8 +1,12 @@
 # Copyright (c) 2024-2025 iiPython
 
 import re
+import operator
+from functools import lru_cache
 from dataclasses import dataclass
 
+from .stack import RESERVED_REGISTERS
+
 LINE_REGEX = re.compile(r"\"[^\"]*\"|\S+")
 SIZE_SYSTEM_MAPPING = {
     "BINARY":  1024,
@@ -11,6 +15,34 @@ SIZE_SYSTEM_MAPPING = {
     "DEC":     1000
 }
 
+# Operand regex assignments; only string substitution still needs a pattern,
+# bound as a method so each use skips the re module API
+STRING_SUB_REGEX = re.compile(r"(\$\w+)")
+split_string_subs = STRING_SUB_REGEX.split
+
+# Cast mapping resolved onto cst instructions at parse time
+CAST_TYPES = {
+    "INTEGER": int,
+    "STRING":  str
+}
+
+# Small integer opcodes; the interpreter dispatches through a tuple indexed by
+# these instead of hashing mnemonic strings
+OPCODES = {mnemonic: opcode for opcode, mnemonic in enumerate((
+    "out", "lbl", "ext", "cls", "alc", "inp", "arith",
+    "cst", "cmp", "cmp_jmp", "jmp", "drp", "set"
+))}
+
+# Operator mapping resolved onto arith instructions (and used to evaluate
+# arithmetic on literal operands) at parse time
+OPERATIONS = {
+    "add": operator.add,
+    "sub": operator.sub,
+    "mul": operator.mul,
+    "div": operator.truediv,
+    "pow": operator.pow
+}
+
 @dataclass
 class Program:
     name:       str
@@ -19,8 +51,119 @@ class Program:
     """The byte size of the stack for this program."""
     lines:      list[list[str]]
     """The parsed line data for this program."""
+    code:       list[tuple[int, tuple]]
+    """The resolved (opcode, operands) form of each line."""
     labels:     dict[str, int]
     """Label mappings for this program."""
+    registers:  list[str]
+    """Register index to variable name mappings for this program."""
+
+def parse_variable(token: str) -> str:
+    if token[:1] != "&" or not token[1:]:
+        raise SyntaxError
+
+    return token[1:]
+
+def parse_allocation(token: str) -> int:
+    if token[:2] != ":[" or token[-1:] != "]" or not token[2:-1].isnumeric():
+        raise SyntaxError
+
+    return int(token[2:-1])
+
+def parse_operand(token: str) -> tuple[str, object]:
+    """Translate a raw operand token into a tagged (type, payload) pair so the
+    interpreter never has to re-tokenize it at runtime."""
+    if token[0] == "&":
+        return ("var", parse_variable(token))
+
+    return parse_constant(token)
+
+@lru_cache(maxsize = 256)
+def parse_constant(token: str) -> tuple[str, object]:
+    """Parse a constant (non-variable) operand token; memoized since the same
+    literal often appears on many lines of a program."""
+    if token.lstrip("-").isnumeric():
+        return ("int", int(token))
+
+    if not (token[0] == "\"" and token[-1] == "\"" and len(token) > 1):
+        raise SyntaxError
+
+    token = token.strip("\"")
+    if "$" not in token:
+        return ("str", decode_escapes(token))
+
+    # Split the template into literal fragments and variable references; re.split
+    # with a capture group alternates fragment / match / fragment / ...
+    parts = []
+    for index, part in enumerate(split_string_subs(token)):
+        if index % 2:
+            parts.append(("var", part[1:]))
+
+        elif part:
+            parts.append(("lit", decode_escapes(part)))
+
+    return ("tmpl", tuple(parts))
+
+def decode_escapes(literal: str) -> str:
+    """Resolve backslash escape sequences inside a string literal."""
+    return literal.encode("latin-1", "backslashreplace").decode("unicode-escape")
+
+def parse_instruction(code_line: list[str]) -> tuple[str, tuple]:
+    """Resolve a tokenized code line into a (mnemonic, operands) pair with every
+    operand preparsed by parse_operand()."""
+    match code_line:
+        case ["out", message]:
+            return ("out", (parse_operand(message),))
+
+        case ["lbl", _]:
+            return ("lbl", ())
+
+        case ["ext", code]:
+            return ("ext", (parse_operand(code),))
+
+        case ["cls"]:
+            return ("cls", ())
+
+        case ["alc", variable, allocation]:
+            return ("alc", (parse_variable(variable), parse_allocation(allocation)))
+
+        case ["inp", prompt, ">", variable]:
+            return ("inp", (parse_operand(prompt), parse_variable(variable)))
+
+        case ["add" | "sub" | "mul" | "div" | "pow" as operator_type, num1, num2, ">", variable]:
+            operand1, operand2 = parse_operand(num1), parse_operand(num2)
+
+            # Fold arithmetic on two integer literals down to a plain set; kept
+            # for runtime when the result is not an integer (div, negative pow)
+            # or the evaluation fails, so those still surface through slx
+            if operand1[0] == "int" and operand2[0] == "int":
+                try:
+                    result = OPERATIONS[operator_type](operand1[1], operand2[1])
+                    if isinstance(result, int):
+                        return ("set", (("int", result), parse_variable(variable)))
+
+                except ArithmeticError:
+                    pass
+
+            return ("arith", (OPERATIONS[operator_type], operand1, operand2, parse_variable(variable)))
+
+        case ["cst", variable, "STRING" | "INTEGER" as cast_type]:
+            return ("cst", (parse_variable(variable), CAST_TYPES[cast_type]))
+
+        case ["cmp", variable1, variable2]:
+            return ("cmp", (parse_operand(variable1), parse_operand(variable2)))
+
+        case ["jeq" | "jne" | "jgt" | "jlt" | "jge" | "jle" as jump_type, label]:
+            return ("jmp", (jump_type, label))
+
+        case ["drp", variable]:
+            return ("drp", (parse_variable(variable),))
+
+        case [value, ">", variable]:
+            return ("set", (parse_operand(value), parse_variable(variable)))
+
+        case _ as default:
+            raise SyntaxError(default)
 
 def process_lines(lines: list[str]) -> list[list[str]]:
     """Taking in unprocessed lines, remove comments and return the parsed version."""
@@ -33,7 +176,7 @@ def process_lines(lines: list[str]) -> list[list[str]]:
 
 def construct_program(lines: list[str]) -> Program:
     processed_lines = process_lines(lines)
-    program = {"name": None, "byte_size": 8192, "lines": [], "labels": {}}
+    program = {"name": None, "byte_size": 8192, "lines": [], "code": [], "labels": {}}
     in_code_block, last_line = False, 0
     for index, line in enumerate(processed_lines):
         match line:
@@ -81,8 +224,85 @@ def construct_program(lines: list[str]) -> Program:
                 # Push to lines
                 in_code_block = True
                 program["lines"].append(code_line)
+                program["code"].append(parse_instruction(code_line))
 
             case _ as default:
                 raise Exception(f"Something didn't match! {default}")
 
+    # Second pass: resolve symbolic jump labels to integer line targets, and
+    # assign every variable name an integer register index so the runtime
+    # addresses registers by position instead of hashing name strings
+    register_indexes = {name: index for index, name in enumerate(RESERVED_REGISTERS)}
+
+    def resolve_register(name: str) -> int:
+        if name not in register_indexes:
+            register_indexes[name] = len(register_indexes)
+
+        return register_indexes[name]
+
+    def resolve_operand_registers(operand: tuple[str, object]) -> tuple[str, object]:
+        match operand:
+            case ("var", name):
+                return ("var", resolve_register(name))  # pyright: ignore
+
+            case ("tmpl", parts):
+                return ("tmpl", tuple(
+                    ("var", resolve_register(part)) if part_tag == "var" else (part_tag, part)
+                    for part_tag, part in parts  # pyright: ignore
+                ))
+
+        return operand
+
+    for index, (mnemonic, operands) in enumerate(program["code"]):
+        match mnemonic:
+            case "jmp":
+                jump_type, label = operands
+                if label not in program["labels"]:
+                    raise SyntaxError(f"jump to unknown label '{label}'")
+
+                operands = (jump_type, program["labels"][label])
+
+            case "out" | "ext":
+                operands = (resolve_operand_registers(operands[0]),)
+
+            case "alc":
+                operands = (resolve_register(operands[0]), operands[1])
+
+            case "inp":
+                operands = (resolve_operand_registers(operands[0]), resolve_register(operands[1]))
+
+            case "arith":
+                operation, operand1, operand2, variable = operands
+                operands = (operation, resolve_operand_registers(operand1), resolve_operand_registers(operand2), resolve_register(variable))
+
+            case "cst":
+                operands = (resolve_register(operands[0]), operands[1])
+
+            case "cmp":
+                operands = (resolve_operand_registers(operands[0]), resolve_operand_registers(operands[1]))
+
+            case "drp":
+                operands = (resolve_register(operands[0]),)
+
+            case "set":
+                operands = (resolve_operand_registers(operands[0]), resolve_register(operands[1]))
+
+        program["code"][index] = (mnemonic, operands)
+
+    # Fuse each cmp followed immediately by a conditional jump into one compound
+    # instruction, leaving a no-op in the jump's slot so line indices (and the
+    # label targets already resolved against them) stay put
+    for index in range(len(program["code"]) - 1):
+        mnemonic, operands = program["code"][index]
+        next_mnemonic, next_operands = program["code"][index + 1]
+        if mnemonic == "cmp" and next_mnemonic == "jmp":
+            jump_type, target = next_operands
+            program["code"][index] = ("cmp_jmp", (jump_type, operands[0], operands[1], target))
+            program["code"][index + 1] = ("lbl", ())
+
+    # Encode mnemonics down to their integer opcodes now that every pass over
+    # the readable form is done
+    program["code"] = [(OPCODES[mnemonic], operands) for mnemonic, operands in program["code"]]
+
+    program["registers"] = list(register_indexes)
     return Program(**program)
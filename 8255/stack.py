@@ -2,6 +2,8 @@
 
 # Modules
 from enum import Enum
+from struct import Struct
+from functools import lru_cache
 from dataclasses import dataclass
 
 # Exceptions
@@ -30,7 +32,27 @@ class MemoryOverflow(StackError):
     pass
 
 # Typing
-ALLOCATED = b"\x00"  # Might change eventually
+RESERVED_REGISTERS = ("slx", "sly", "slz")
+RESERVED_COUNT = len(RESERVED_REGISTERS)
+
+# Fixed-width signed integer codecs, packed and unpacked straight against the
+# store with no intermediate bytes object; other widths fall back to to_bytes
+INTEGER_STRUCTS = {
+    1: Struct(">b"),
+    2: Struct(">h"),
+    4: Struct(">i"),
+    8: Struct(">q")
+}
+
+# Byte run patterns by size, shared by allocation marking, dropping, and the
+# free-run search so repeated same-size operations skip rebuilding them
+@lru_cache(maxsize = None)
+def zero_run(size: int) -> bytes:
+    return bytes(size)
+
+@lru_cache(maxsize = None)
+def one_run(size: int) -> bytes:
+    return b"\x01" * size
 
 class DataType(Enum):
     INTEGER = 1
@@ -47,115 +69,150 @@ class Allocation:
 class Register:
     allocation: Allocation
     datatype:   DataType
-
-@dataclass
-class ReservedRegister:
-    value:  int
+    valid:      bool = False
 
 # Handle the stack :3
 class Stack:
-    def __init__(self, size: int) -> None:
+    def __init__(self, size: int, registers: list[str]) -> None:
         self.size:  int = size
-        self.vars:  dict[str, Register | ReservedRegister] = {
-            "slx": ReservedRegister(0),
-            "sly": ReservedRegister(0),
-            "slz": ReservedRegister(0),
-        }
-        self.store: list[None | int | bytes] = [None] * size
-
-    def serialize(self, value: str | int, size: int) -> list[int]:
+        self.names: list[str] = registers
+        self.regs:  list[Register | None] = [None] * len(registers)
+
+        # Reserved registers live in dedicated slots (construct always assigns
+        # them the first indices) so the interpreter writes them directly
+        self.slx:   int = 0
+        self.sly:   int = 0
+        self.slz:   int = 0
+        self.store: bytearray = bytearray(size)
+        self.valid: bytearray = bytearray(size)
+
+        # Zero-copy window over the store; the store never resizes, so keeping
+        # one view lets integer reads skip the slice copy entirely
+        self.view:  memoryview = memoryview(self.store)
+
+        # Allocator state: a bump cursor over never-used memory, plus free lists
+        # of dropped chunk offsets keyed by chunk size
+        self.bump:  int = 0
+        self.free:  dict[int, list[int]] = {}
+
+    def serialize(self, value: str | int, size: int) -> bytes:
         if isinstance(value, int):
-            return list(value.to_bytes(size, signed = True))
+            return value.to_bytes(size, signed = True)
 
-        string_value = list(value.encode("ascii"))
-        return string_value + [0] * (size - len(string_value))
+        return value.encode("ascii").ljust(size, b"\x00")
 
     def allocate(self, size: int) -> Allocation:
-        count, start_index = 0, -1
-        for i, item in enumerate(self.store):
-            if item is None:
-                if count == 0:
-                    start_index = i
 
-                count += 1
-                if count == size:
-                    self.store[start_index:start_index + size] = [ALLOCATED] * size
-                    return Allocation(start_index, start_index + size - 1, size)
+        # Fast path: reuse a dropped chunk of the exact same size, or bump into
+        # memory that has never been handed out
+        valid = self.valid
+        free_list = self.free.get(size)
+        while free_list:
+            start_index = free_list.pop()
+            if b"\x01" not in valid[start_index:start_index + size]:  # Guard against chunks reclaimed by the scan below
+                valid[start_index:start_index + size] = one_run(size)
+                return Allocation(start_index, start_index + size - 1, size)
+
+        if self.bump + size <= self.size:
+            start_index = self.bump
+            self.bump += size
+            valid[start_index:start_index + size] = one_run(size)
+            return Allocation(start_index, start_index + size - 1, size)
+
+        # Slow path: search the validity map for a free run anywhere in the
+        # stack, done as a single substring find instead of a Python loop
+        start_index = valid.find(zero_run(size))
+        if start_index < 0:
+            raise MemoryOverflow("out of memory to store object")
+
+        valid[start_index:start_index + size] = one_run(size)
+
+        # Keep the bump cursor past anything handed out here, since the bump
+        # fast path trusts that everything beyond it has never been allocated
+        if start_index + size > self.bump:
+            self.bump = start_index + size
+
+        return Allocation(start_index, start_index + size - 1, size)
 
-            else:
-                count = 0
+    def write(self, allocation: Allocation, value: str | int) -> None:
+        start, size = allocation.start, allocation.size
+        if isinstance(value, int):
+            integer_struct = INTEGER_STRUCTS.get(size)
+            if integer_struct is not None:
+                return integer_struct.pack_into(self.store, start, value)
 
-        raise MemoryOverflow("out of memory to store object")
+        serialized_value = self.serialize(value, size)
+        if len(serialized_value) > size:
+            raise MemoryOverflow(f"requested value {repr(value)} ({len(serialized_value)} bytes) exceeds allocated memory size of {size} bytes")
 
-    def write(self, allocation: Allocation, value: str | int) -> None:
-        serialized_value = self.serialize(value, allocation.size)
-        if len(serialized_value) > allocation.size:
-            raise MemoryOverflow(f"requested value {repr(value)} ({len(serialized_value)} bytes) exceeds allocated memory size of {allocation.size} bytes")
-        
         if allocation.end - 1 > self.size:
             raise MemoryOverflow(f"requested value {repr(value)} ({len(serialized_value)} bytes) exceeds buffer size of {self.size} bytes")
 
-        self.store[allocation.start:allocation.end + 1] = serialized_value
+        self.store[start:allocation.end + 1] = serialized_value
 
-    def get(self, allocation: Allocation, cast: DataType) -> str | int:
-        value = self.store[allocation.start:allocation.end + 1]
-        if any(b is None for b in value):
+    def get(self, allocation: Allocation, cast: DataType, validated: bool = False) -> str | int:
+        start, stop = allocation.start, allocation.end + 1
+        if not validated and b"\x00" in self.valid[start:stop]:
             raise NullDataInOperation
 
         match cast:
             case DataType.INTEGER:
-                return int.from_bytes(bytes(value), signed = True)  # type: ignore | Handled by the any() check above
+                integer_struct = INTEGER_STRUCTS.get(allocation.size)
+                if integer_struct is not None:
+                    return integer_struct.unpack_from(self.store, start)[0]
+
+                return int.from_bytes(self.view[start:stop], signed = True)
 
             case DataType.STRING:
-                return bytes(v for v in value if v).decode("ascii")  # type: ignore | Handled by the any() check above
+                return self.store[start:stop].replace(b"\x00", b"").decode("ascii")
 
             case DataType.NOTSET:  # DataType.NOTSET is not supported for these operations
                 raise StackError("NOTSET datatype is not valid for get operations")
 
     def drop(self, allocation: Allocation) -> None:
-        self.store[allocation.start:allocation.end + 1] = [None] * allocation.size
+        self.store[allocation.start:allocation.end + 1] = zero_run(allocation.size)
+        self.valid[allocation.start:allocation.end + 1] = zero_run(allocation.size)
+        self.free.setdefault(allocation.size, []).append(allocation.start)
 
-    # Handle variables
-    def allocate_variable(self, name: str, size: int) -> None:
-        if name in self.vars:
+    # Handle registers (variables addressed by their construct-time index)
+    def allocate_register(self, index: int, size: int) -> None:
+        if index < RESERVED_COUNT or self.regs[index] is not None:
             raise ValueError("specified variable has already been allocated to the stack")
 
-        self.vars[name] = Register(self.allocate(size), DataType.NOTSET)
-
-    def write_variable(self, name: str, value: str | int, reserved: bool = False) -> None:
-        if name not in self.vars:
-            raise NotAllocated(name)
+        self.regs[index] = Register(self.allocate(size), DataType.NOTSET)
 
-        if isinstance(self.vars[name], ReservedRegister):
-            if not reserved:
-                raise ReservedName(name)
+    def write_register(self, index: int, value: str | int) -> None:
+        if index < RESERVED_COUNT:
+            raise ReservedName(self.names[index])
 
-            self.vars[name].value = value  # pyright: ignore
-            return
+        register = self.regs[index]
+        if register is None:
+            raise NotAllocated(self.names[index])
 
-        # Pyright is retarded... the following lines are safe due to the
-        # isinstance() check right above us
-        self.vars[name].datatype = DataType.INTEGER if isinstance(value, int) else DataType.STRING  # pyright: ignore
-        self.write(self.vars[name].allocation, value)  # pyright: ignore
+        register.datatype = DataType.INTEGER if isinstance(value, int) else DataType.STRING
+        self.write(register.allocation, value)
+        register.valid = True
 
-    def get_variable(self, name: str) -> str | int:
-        if name not in self.vars:
-            raise NotAllocated(name)
+    def get_register(self, index: int) -> str | int:
+        if index < RESERVED_COUNT:
+            return (self.slx, self.sly, self.slz)[index]
 
-        if isinstance(self.vars[name], ReservedRegister):
-            return self.vars[name].value  # pyright: ignore
+        register = self.regs[index]
+        if register is None:
+            raise NotAllocated(self.names[index])
 
-        if self.vars[name].datatype == DataType.NOTSET:  # pyright: ignore
+        if register.datatype == DataType.NOTSET:
             raise NullDataInOperation
 
-        return self.get(self.vars[name].allocation, self.vars[name].datatype)  # pyright: ignore
+        return self.get(register.allocation, register.datatype, register.valid)
 
-    def drop_variable(self, name: str) -> None:
-        if name not in self.vars:
-            raise NotAllocated(name)
+    def drop_register(self, index: int) -> None:
+        if index < RESERVED_COUNT:
+            raise ReservedName(self.names[index])
 
-        if isinstance(self.vars[name], ReservedRegister):
-            raise ReservedName(name)
+        register = self.regs[index]
+        if register is None:
+            raise NotAllocated(self.names[index])
 
-        self.drop(self.vars[name].allocation)  # pyright: ignore
-        del self.vars[name]
+        self.drop(register.allocation)
+        self.regs[index] = None